@@ -8,16 +8,58 @@ import traceback
 import threading
 import queue
 
+import absorbance
+import acquisition
+import fake_serial
+import frame_server
+import processing
+import profiling
+import recordings
+import scheduler
+import stitching
+import trigger
+
 # Serial port configuration
 COM_PORT = "/dev/ttyACM0"  # Replace with your actual COM port
 BAUD_RATE = 115200
 
+# Publish frames to other tools, e.g. ("127.0.0.1", 5555) or "/tmp/livespectra.sock"
+FRAME_SERVER_ADDRESS = None
+
+# Length of a "Measurement" capture in seconds
+MEASUREMENT_DURATION = 5
+
+# Acquisition modes sharing the reader thread: "5" VIS+IR, "3" light,
+# "2" single VIS. Weights split the port between enabled modes, a rate
+# (frames/s) caps a mode, None runs it as fast as the device allows.
+MODE_WEIGHTS = {"5": 1, "3": 1, "2": 1}
+MODE_RATES = {"5": None, "3": None, "2": None}
+
+# Frames of history kept per mode
+RING_CAPACITY = 1000
+
+# Frames averaged for the dark and reference (falling light) spectra
+REFERENCE_FRAMES = 20
+
+# Frames kept before and captured after a trigger event (defaults)
+TRIGGER_PRE_FRAMES = 50
+TRIGGER_POST_FRAMES = 50
+
 class SpectraPlotter(QtCore.QObject):
-    def __init__(self, com_port, baud_rate):
+    # Emitted from the reader thread when a scheduled measurement completes
+    measurement_done = QtCore.Signal(object)
+    # Emitted with "dark" or "reference" when that average has been captured
+    reference_done = QtCore.Signal(str, object)
+    # Emitted from the event writer thread with the saved file name
+    event_saved = QtCore.Signal(str)
+
+    def __init__(self, com_port, baud_rate, frame_server_address=None, ser=None):
         super().__init__()
         self.com_port = com_port
         self.baud_rate = baud_rate
-        self.ser = None
+        self.ser = ser  # pre-opened serial-like source, e.g. replay.ReplaySerial
+        self.frame_server_address = frame_server_address
+        self.frame_server = None
         self.app = pg.mkQApp("Real-time Spectra Plotting")
 
         pg.setConfigOption('background', 'w')
@@ -48,6 +90,28 @@ class SpectraPlotter(QtCore.QObject):
         self.plotIR.setLabel('left', 'Intensity')
         self.plotIR.setLabel('bottom', 'Wavelength (nm)')
 
+        # Combined VIS+IR on a common grid, shown when "Stitched" is checked
+        self.stitcher = stitching.Stitcher(self.nm, self.nmIR)
+        self.plot_widget.nextRow()
+        self.plotStitched = self.plot_widget.addPlot(title="Stitched Spectra", colspan=2)
+        self.curveStitched = self.plotStitched.plot(pen='k')
+        self.plotStitched.setLabel('left', 'Intensity')
+        self.plotStitched.setLabel('bottom', 'Wavelength (nm)')
+        self.plotStitched.setVisible(False)
+
+        # Light ("3") and single visible ("2") modes, shown while enabled
+        self.plot_widget.nextRow()
+        self.plot3 = self.plot_widget.addPlot(title="Light Spectra")
+        self.curve3 = self.plot3.plot(pen='#FF8C00')
+        self.plot3.setLabel('left', 'Intensity')
+        self.plot3.setLabel('bottom', 'Wavelength (nm)')
+        self.plot3.setVisible(False)
+
+        self.plot2 = self.plot_widget.addPlot(title="Single Visible Spectra")
+        self.curve2 = self.plot2.plot(pen='#008000')
+        self.plot2.setLabel('left', 'Intensity')
+        self.plot2.setLabel('bottom', 'Wavelength (nm)')
+        self.plot2.setVisible(False)
         
         # Buttons5
         button_layout = QtWidgets.QHBoxLayout()
@@ -55,38 +119,122 @@ class SpectraPlotter(QtCore.QObject):
         
         self.instant_button = QtWidgets.QPushButton("Measurement")
         self.instant3_button = QtWidgets.QPushButton("3rd Spectra")
+        self.campaign_button = QtWidgets.QPushButton("Campaign")
+        self.light_check = QtWidgets.QCheckBox("Light")
+        self.single_check = QtWidgets.QCheckBox("Single VIS")
+        self.processing_check = QtWidgets.QCheckBox("Processing")
+        self.stitched_check = QtWidgets.QCheckBox("Stitched")
+        self.profiling_check = QtWidgets.QCheckBox("Profiling")
         
 
         button_layout.addWidget(self.instant_button)
         button_layout.addWidget(self.instant3_button)
-
+        button_layout.addWidget(self.campaign_button)
+        button_layout.addWidget(self.light_check)
+        button_layout.addWidget(self.single_check)
+        button_layout.addWidget(self.processing_check)
+        button_layout.addWidget(self.stitched_check)
+        button_layout.addWidget(self.profiling_check)
+
+        # Absorbance: dark from "5" frames, reference from the "3" light spectrum
+        absorbance_layout = QtWidgets.QHBoxLayout()
+        main_layout.addLayout(absorbance_layout)
+
+        self.dark_button = QtWidgets.QPushButton("Dark")
+        self.reference_button = QtWidgets.QPushButton("Reference")
+        self.display_combo = QtWidgets.QComboBox()
+        self.display_combo.addItems(["Intensity", "Transmittance", "Absorbance"])
+        self.display_combo.setToolTip("Transmittance and absorbance need a reference; "
+                                      "they are computed from raw VIS intensities without Processing")
+
+        absorbance_layout.addWidget(self.dark_button)
+        absorbance_layout.addWidget(self.reference_button)
+        absorbance_layout.addWidget(self.display_combo)
+
+        self.trigger_button = QtWidgets.QPushButton("Trigger")
+        self.trigger_button.setCheckable(True)
+        absorbance_layout.addWidget(self.trigger_button)
+        absorbance_layout.addStretch()
+
+
+        # Timing spans, switched on from the "Profiling" box or LIVESPECTRA_PROFILE
+        self.profiler = profiling.Profiler.from_environment()
+        self.profiler.instrument(self, "read_spectra", "read_spectra3", "read_spectra2", "update_plot",
+                                 "save_measurement", "save_spectra3")
+        self.profiling_check.setChecked(self.profiler.enabled)
 
         self.instant_button.clicked.connect(self.instant_measurement)
         self.instant3_button.clicked.connect(self.instant_measurement3)
+        self.campaign_button.clicked.connect(self.campaign)
+        self.measurement_done.connect(self.save_measurement)
+        self.light_check.toggled.connect(self.set_light)
+        self.single_check.toggled.connect(self.set_single)
+        self.processing_check.toggled.connect(self.set_processing)
+        self.stitched_check.toggled.connect(self.set_stitched)
+        self.profiling_check.toggled.connect(self.set_profiling)
+        self.dark_button.clicked.connect(self.capture_dark)
+        self.reference_button.clicked.connect(self.capture_reference)
+        self.reference_done.connect(self.set_reference)
+        self.display_combo.currentTextChanged.connect(self.set_display)
+        self.trigger_button.toggled.connect(self.arm_trigger)
+        self.event_saved.connect(self.show_event)
 
         # Initialization
         self.data_array = np.zeros(296)
         self.data_arrayIR = np.zeros(256)
         self.data_array3 = np.zeros(296)
+        self.data_array2 = np.zeros(296)
         self.running = False
         self.reading_started = False
-        self.collected_data = []
-        self.collected_dataIR = []
-        self.collected_data3 = []
         self.ser_lock = threading.Lock()
         self.data_lock = threading.Lock()
         self.latest_spectra = None
         self.latest_spectraIR = None
         self.latest_spectra3 = None
-
+        self.latest_stitched = None
+        self.scheduler = scheduler.MeasurementScheduler()
+        self.measurement_job = None
+        self.measurement3_job = None
+        self.campaign_job = None
+        self.reference_job = None
+        self.stitched_enabled = False
+        self.converter = absorbance.AbsorbanceConverter()
+        self.display_mode = "Intensity"
+        self.trigger = None
+        self.event_writer = None
+
+        # The reader thread owns every device command
+        self.modes = acquisition.ModeScheduler()
+        for mode in ("5", "3", "2"):
+            self.modes.add_mode(mode, MODE_WEIGHTS[mode], MODE_RATES[mode], enabled=mode == "5")
+        self.acquire = {
+            "5": self.acquire_spectra,
+            "3": self.acquire_spectra3,
+            "2": self.acquire_spectra2,
+        }
+        self.buffer = acquisition.RingBuffer(RING_CAPACITY, 296)
+        self.bufferIR = acquisition.RingBuffer(RING_CAPACITY, 256)
+        self.buffer3 = acquisition.RingBuffer(RING_CAPACITY, 296)
+        self.buffer2 = acquisition.RingBuffer(RING_CAPACITY, 296)
+
+        # Smoothing / baseline / normalization applied to the live display
+        self.pipeline = processing.default_pipeline()
+        self.processing_enabled = False
+        self.frame_count = 0
 
         self.spectra_ready = False
         self.IRspectra_ready = False
         self.spectra3_ready = False
+        self.spectra2_ready = False
 
         self.main_window.show()
 
     def connect_serial(self):
+        if self.ser is not None:
+            return True
+        if self.com_port == fake_serial.SIMULATED_PORT:
+            self.ser = fake_serial.FakeSerial()
+            return True
         try:
             self.ser = serial.Serial(self.com_port, self.baud_rate, timeout=0.1)
             return True
@@ -168,23 +316,85 @@ class SpectraPlotter(QtCore.QObject):
     def read_loop(self):
         while self.running:
             if self.reading_started:
+                mode, wait = self.modes.next_mode(time.monotonic())
+                if mode is None:
+                    time.sleep(min(wait, 0.05))
+                    continue
+                with self.profiler.span("read_loop"):
+                    self.acquire[mode]()
+                self.modes.mark(mode, time.monotonic())
 
-                spectra_ready, IRspectra_ready = self.read_spectra()
-
-                if spectra_ready and IRspectra_ready:
-                    with self.data_lock:
-                        self.latest_spectra = self.data_array.copy()
-                        self.latest_spectraIR = self.data_arrayIR.copy()                        
-                    self.collected_data.append(self.data_array)
-                    self.collected_dataIR.append(self.data_arrayIR)
+            else:
+                time.sleep(0.05)
 
 
+    def acquire_spectra(self):
+        spectra_ready, IRspectra_ready = self.read_spectra()
+        frame_time = time.monotonic()
+
+        if spectra_ready and IRspectra_ready:
+            if self.display_mode == "Transmittance" and self.converter.ready:
+                spectra = self.converter.transmittance(self.data_array)
+                spectraIR = self.data_arrayIR.copy()
+            elif self.display_mode == "Absorbance" and self.converter.ready:
+                spectra = self.converter.absorbance(self.data_array)
+                spectraIR = self.data_arrayIR.copy()
+            elif self.processing_enabled:
+                spectra = self.pipeline.process(self.data_array)
+                spectraIR = self.pipeline.process(self.data_arrayIR)
             else:
-                time.sleep(0.05)
-    
+                spectra = self.data_array.copy()
+                spectraIR = self.data_arrayIR.copy()
+            stitched = None
+            if self.stitched_enabled:
+                stitched = self.stitcher.stitch(self.data_array, self.data_arrayIR)
+            self.buffer.append(self.data_array, frame_time)
+            self.bufferIR.append(self.data_arrayIR, frame_time)
+            with self.data_lock:
+                self.latest_spectra = spectra
+                self.latest_spectraIR = spectraIR
+                self.latest_stitched = stitched
+            # One wall clock stamp for both halves, so consumers can pair them
+            wall_time = time.time()
+            self.publish_frame(frame_server.CHANNEL_VIS, self.data_array, self.frame_count, wall_time)
+            self.publish_frame(frame_server.CHANNEL_IR, self.data_arrayIR, self.frame_count, wall_time)
+            self.frame_count += 1
+            self.scheduler.offer(frame_time, self.data_array, self.data_arrayIR, source="5")
+            trigger_engine = self.trigger
+            if trigger_engine is not None:
+                trigger_engine.offer(frame_time, self.data_array, self.data_arrayIR)
+
+
+    def acquire_spectra3(self):
+        if self.read_spectra3():
+            frame_time = time.monotonic()
+            seq = self.buffer3.total  # counted before the append, from 0 like frame_count
+            self.buffer3.append(self.data_array3, frame_time)
+            with self.data_lock:
+                self.spectra3_ready = True
+            self.publish_frame(frame_server.CHANNEL_LIGHT, self.data_array3, seq)
+            self.scheduler.offer(frame_time, self.data_array3, source="3")
+
+
+    def acquire_spectra2(self):
+        if self.read_spectra2():
+            frame_time = time.monotonic()
+            seq = self.buffer2.total  # counted before the append, from 0 like frame_count
+            self.buffer2.append(self.data_array2, frame_time)
+            with self.data_lock:
+                self.spectra2_ready = True
+            self.publish_frame(frame_server.CHANNEL_VIS_SINGLE, self.data_array2, seq)
+            self.scheduler.offer(frame_time, self.data_array2, source="2")
+
+
+    def publish_frame(self, channel, data, seq, timestamp=None):
+        if self.frame_server is not None:
+            self.frame_server.publish(channel, data, seq=seq, timestamp=timestamp)
+
 
     def read_spectra3(self):
         with self.ser_lock:
+            self.ser.reset_input_buffer()
             start_command = "3"
             self.ser.write(start_command.encode('utf-8'))  
 
@@ -221,6 +431,225 @@ class SpectraPlotter(QtCore.QObject):
 
     
 
+    def read_spectra2(self):
+        with self.ser_lock:
+            self.ser.reset_input_buffer()
+            start_command = "2"
+            self.ser.write(start_command.encode('utf-8'))
+
+            try:
+                if self.ser.in_waiting:
+
+                    _ = self.ser.readline()
+
+                    intensities = []
+                    for _ in range(296):
+                        line = self.ser.readline().decode('utf-8').strip()
+                        try:
+                            value = float(line)
+                            intensities.append(value)
+                        except ValueError:
+                            continue
+
+                    spectra2_complete = len(intensities) == 296
+
+                    if spectra2_complete:
+                        self.data_array2 = np.array(intensities)
+
+                    return spectra2_complete
+
+                return False
+
+            except Exception as e:
+                traceback.print_exc()
+                print(f"An error occurred during single spectrum read: {e}")
+                return False
+
+
+
+    def set_mode_available(self, mode, available):
+        # For a source that cannot serve a mode (e.g. a replayed recording
+        # without that channel): stop reading it and disable the controls
+        # whose jobs would wait for its frames forever
+        controls = {
+            "5": [self.instant_button, self.campaign_button, self.dark_button,
+                  self.trigger_button, self.stitched_check],
+            "3": [self.instant3_button, self.reference_button, self.light_check],
+            "2": [self.single_check],
+        }[mode]
+        if not available:
+            for control in controls:
+                if control.isCheckable():
+                    control.setChecked(False)
+        for control in controls:
+            control.setEnabled(available)
+        if mode == "5":
+            self.modes.set_enabled("5", available)
+
+
+    def set_processing(self, enabled):
+        self.processing_enabled = enabled
+
+
+    def set_light(self, enabled):
+        self.update_light_mode()
+        self.plot3.setVisible(enabled)
+
+
+    def update_light_mode(self):
+        # Mode "3" runs while shown live or while a job needs light frames
+        self.modes.set_enabled("3", self.light_check.isChecked()
+                               or self.measurement3_job is not None
+                               or self.reference_job is not None)
+
+
+    def set_single(self, enabled):
+        self.modes.set_enabled("2", enabled)
+        self.plot2.setVisible(enabled)
+
+
+    def capture_dark(self):
+        job = scheduler.FrameCountJob(REFERENCE_FRAMES)
+        self.dark_button.setEnabled(False)
+        self.scheduler.submit(job, lambda job: self.reference_done.emit("dark", job), source="5")
+        self.start_reading()
+
+
+    def capture_reference(self):
+        if self.reference_job is not None:
+            return
+        self.reference_job = scheduler.FrameCountJob(REFERENCE_FRAMES)
+        self.reference_button.setEnabled(False)
+        self.scheduler.submit(self.reference_job, lambda job: self.reference_done.emit("reference", job), source="3")
+        self.update_light_mode()
+        self.start_reading()
+
+
+    def set_reference(self, kind, job):
+        try:
+            if kind == "dark":
+                self.dark_button.setEnabled(True)
+            else:
+                self.reference_job = None
+                self.reference_button.setEnabled(True)
+                self.update_light_mode()
+
+            result = job.result()
+            if job.cancelled or result is None:
+                return
+            average = result[0].mean(axis=0)
+            if kind == "dark":
+                self.converter.set_dark(average)
+            else:
+                self.converter.set_reference(average)
+
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Error capturing {kind} spectrum: {e}")
+
+
+    def set_display(self, mode):
+        if mode != "Intensity" and not self.converter.ready:
+            QtWidgets.QMessageBox.information(
+                self.main_window,
+                "No Reference",
+                "Capture a reference spectrum to show transmittance or absorbance."
+            )
+            # Back to intensities rather than label raw data as mode
+            self.display_combo.setCurrentText("Intensity")
+            return
+        self.display_mode = mode
+        self.plot.setLabel('left', mode)
+        # Processing only applies to intensities
+        self.processing_check.setEnabled(mode == "Intensity")
+        self.processing_check.setToolTip(
+            "" if mode == "Intensity" else f"Not applied in {mode} display")
+
+
+    def arm_trigger(self, armed):
+        if not armed:
+            self.trigger = None
+            self.main_window.statusBar().showMessage("Trigger disarmed")
+            return
+
+        dialog = QtWidgets.QDialog(self.main_window)
+        dialog.setWindowTitle("Trigger")
+        form = QtWidgets.QFormLayout(dialog)
+        condition = QtWidgets.QComboBox()
+        condition.addItems(["Band sum", "Peak height", "Baseline change"])
+        lo = QtWidgets.QDoubleSpinBox()
+        lo.setRange(340, 850)
+        lo.setValue(540)
+        hi = QtWidgets.QDoubleSpinBox()
+        hi.setRange(340, 850)
+        hi.setValue(580)
+        threshold = QtWidgets.QDoubleSpinBox()
+        threshold.setRange(0, 1e9)
+        threshold.setDecimals(1)
+        threshold.setValue(100000)
+        pre = QtWidgets.QSpinBox()
+        pre.setRange(0, 100000)
+        pre.setValue(TRIGGER_PRE_FRAMES)
+        post = QtWidgets.QSpinBox()
+        post.setRange(1, 100000)
+        post.setValue(TRIGGER_POST_FRAMES)
+        form.addRow("Condition", condition)
+        form.addRow("From (nm)", lo)
+        form.addRow("To (nm)", hi)
+        form.addRow("Threshold", threshold)
+        form.addRow("Frames before", pre)
+        form.addRow("Frames after", post)
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+        if not dialog.exec():
+            self.trigger_button.setChecked(False)
+            return
+
+        kinds = {"Band sum": trigger.BandSum, "Peak height": trigger.PeakHeight,
+                 "Baseline change": trigger.BaselineChange}
+        check = kinds[condition.currentText()](self.nm, lo.value(), hi.value(), threshold.value())
+        if self.event_writer is None:
+            self.event_writer = trigger.EventWriter(on_saved=self.event_saved.emit)
+        self.trigger = trigger.TriggerEngine([check], (296, 256), pre.value(), post.value(), self.event_writer)
+        self.main_window.statusBar().showMessage("Trigger armed")
+        self.start_reading()
+
+
+    def show_event(self, filename):
+        self.main_window.statusBar().showMessage(f"Event saved: {filename}")
+
+
+    def set_stitched(self, enabled):
+        self.stitched_enabled = enabled
+        self.plotStitched.setVisible(enabled)
+
+
+    def set_profiling(self, enabled):
+        if enabled:
+            self.profiler.reset()
+            self.profiler.start_capture()
+        else:
+            self.dump_profile()
+            self.profiler.enabled = False
+
+
+    def dump_profile(self, recording=None):
+        # Profile_<time>.txt, or <recording>_profile.txt next to a recording
+        if not self.profiler.enabled:
+            return
+        if recording:
+            filename = recording[:-4] + "_profile.txt"
+        else:
+            filename = time.strftime("Profile_%Y%m%d-%H%M%S.txt")
+        try:
+            self.profiler.dump(filename)
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+
     def update_plot(self):
         if self.reading_started:
             with self.data_lock:
@@ -232,38 +661,119 @@ class SpectraPlotter(QtCore.QObject):
                     self.curveIR.setData(self.nmIR, self.latest_spectraIR)
                     self.IRspectra_ready = False
 
-    
-    def instant_measurement(self):
-        try:
+                if self.stitched_enabled and self.latest_stitched is not None:
+                    self.curveStitched.setData(self.stitcher.grid, self.latest_stitched)
 
+                if self.spectra3_ready:
+                    self.curve3.setData(self.nm, self.buffer3.latest()[1])
+                    self.spectra3_ready = False
 
-            self.stop_reading()
+                if self.spectra2_ready:
+                    self.curve2.setData(self.nm, self.buffer2.latest()[1])
+                    self.spectra2_ready = False
+        self.show_job_progress()
 
 
-            duration = 5
+    def show_job_progress(self):
+        # Progress of running captures; the message expires once they end
+        parts = [f"{name} {job.progress():.0%}" for name, job in (
+            ("Measurement", self.measurement_job),
+            ("3rd Spectra", self.measurement3_job),
+            ("Campaign", self.campaign_job),
+        ) if job is not None and job.start_time is not None]
+        if parts:
+            self.main_window.statusBar().showMessage("   ".join(parts), 2000)
 
-            filename = time.strftime("Spektri_%Y%m%d-%H%M%S.txt") 
-
-            self.collected_data = []
-            self.collected_dataIR = []
+    
+    def instant_measurement(self):
+        try:
+            if self.measurement_job is not None:
+                return
 
             QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+            self.instant_button.setEnabled(False)
 
-            with self.ser_lock:
-                self.ser.reset_input_buffer()
-
+            self.measurement_job = scheduler.DurationJob(MEASUREMENT_DURATION)
+            self.scheduler.submit(self.measurement_job, self.measurement_done.emit, source="5")
             self.start_reading()
-            start_time = time.time()   
 
-            while (time.time() - start_time) < duration:
-                QtWidgets.QApplication.processEvents() 
-                time.sleep(0.05) 
-                
-            self.stop_reading()
+        except Exception as e:
+            self.measurement_job = None
+            self.instant_button.setEnabled(True)
+            QtWidgets.QApplication.restoreOverrideCursor()
+            traceback.print_exc()
+            print(f"Error starting measurement: {e}")
 
 
-            if not self.collected_data and not self.collected_dataIR:
+    def campaign(self):
+        # The Campaign button doubles as Stop while a campaign runs
+        if self.campaign_job is not None:
+            self.scheduler.cancel(self.campaign_job)
+            return
+
+        dialog = QtWidgets.QDialog(self.main_window)
+        dialog.setWindowTitle("Measurement Campaign")
+        form = QtWidgets.QFormLayout(dialog)
+        duration = QtWidgets.QDoubleSpinBox()
+        duration.setRange(0.1, 86400)
+        duration.setValue(MEASUREMENT_DURATION)
+        interval = QtWidgets.QDoubleSpinBox()
+        interval.setRange(0.1, 86400)
+        interval.setValue(60)
+        repetitions = QtWidgets.QSpinBox()
+        repetitions.setRange(1, 100000)
+        repetitions.setValue(10)
+        start = QtWidgets.QLineEdit()
+        start.setPlaceholderText("HH:MM, empty = now")
+        form.addRow("Duration (s)", duration)
+        form.addRow("Every (s)", interval)
+        form.addRow("Repetitions", repetitions)
+        form.addRow("Start time", start)
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+        if not dialog.exec():
+            return
+
+        seconds = duration.value()
+        job = scheduler.RepeatJob(interval.value(), repetitions.value(),
+                                  lambda: scheduler.DurationJob(seconds))
+        if start.text().strip():
+            try:
+                hour, minute = (int(part) for part in start.text().split(":"))
+                scheduler.at_time_of_day(job, hour, minute)
+            except ValueError:
+                QtWidgets.QMessageBox.warning(self.main_window, "Invalid Input", "Start time must be HH:MM")
+                return
+        self.campaign_job = job
+        self.campaign_button.setText("Stop Campaign")
+        self.scheduler.submit(job, self.measurement_done.emit, source="5")
+        self.start_reading()
+
+
+    def save_measurement(self, job):
+        # Runs on the GUI thread for every completed scheduler measurement
+        campaign = self.campaign_job
+        if campaign is not None and (job is campaign or campaign.finished):
+            # Cancelled, or its last repetition is in
+            self.campaign_job = None
+            self.campaign_button.setText("Campaign")
+        if job.source == "3":
+            self.save_spectra3(job)
+            return
+        try:
+            if job is self.measurement_job:
+                self.measurement_job = None
+                self.instant_button.setEnabled(True)
                 QtWidgets.QApplication.restoreOverrideCursor()
+
+            if job.cancelled:
+                return
+
+            result = job.result()
+            if result is None:
                 QtWidgets.QMessageBox.warning(
                     self.main_window,
                     "No Data",
@@ -271,86 +781,50 @@ class SpectraPlotter(QtCore.QObject):
                 )
                 return
 
+            filename = recordings.timestamped_filename("Spektri", job.started_at)
+            spectra, spectraIR = result
+            with self.profiler.span("save_spektri"):
+                recordings.save_spektri(filename, spectra, spectraIR)
+            self.dump_profile(filename)
 
-            with open(filename, 'w') as f:
-                if self.collected_data:
-                    spectra_saved = np.array(self.collected_data).T
-                    f.write(" #Visible Spectra\n")
-                    for row in spectra_saved:
-                        f.write(' '.join(map(str, row)) + '\n') 
-                
-                if self.collected_dataIR:
-                    spectra_savedIR = np.array(self.collected_dataIR).T
-                    f.write(" #Infrared Spectra\n")
-                    for row in spectra_savedIR:
-                        f.write(' '.join(map(str, row)) + '\n')
-
-            QtWidgets.QApplication.restoreOverrideCursor()
-
-            time.sleep(0.5)
-            self.start_reading()
-                
         except Exception as e:
-            QtWidgets.QApplication.restoreOverrideCursor()
             traceback.print_exc()
             print(f"Error saving spectra: {e}")
 
 
     def instant_measurement3(self):
         try:
-
-
-            self.stop_reading()
-            duration = 5
-            self.collected_data3 = []
-
+            if self.measurement3_job is not None:
+                return
 
             QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+            self.instant3_button.setEnabled(False)
 
-            with self.ser_lock:
-                self.ser.reset_input_buffer()
-                
-            
-            start_time = time.time() 
-            self._end_time3 = start_time + duration
-            self.timer3 = QtCore.QTimer(self)
-            self.timer3.timeout.connect(self.measure3_step)
-            self.timer3.start(250)
-        
-        except Exception:
-            QtWidgets.QApplication.restoreOverrideCursor()
-            traceback.print_exc()
-
-
-    def measure3_step(self):
-        try:
-            if time.time() >= self._end_time3:
-                self.timer3.stop()
-                self.save_spectra3()
-                return
-            
-            read = self.read_spectra3()
-            if read:
-                self.collected_data3.append(self.latest_spectra3)      
-
+            self.measurement3_job = scheduler.DurationJob(MEASUREMENT_DURATION)
+            self.scheduler.submit(self.measurement3_job, self.measurement_done.emit, source="3")
+            self.modes.set_enabled("3", True)
+            self.start_reading()
 
         except Exception:
-            self.timer3.stop()
+            self.measurement3_job = None
+            self.instant3_button.setEnabled(True)
             QtWidgets.QApplication.restoreOverrideCursor()
             traceback.print_exc()
 
 
-    def save_spectra3(self):
-        try: 
-
-            with self.ser_lock:
-                self.ser.reset_input_buffer()
-                self.ser.flush()
-
+    def save_spectra3(self, job):
+        try:
+            if job is self.measurement3_job:
+                self.measurement3_job = None
+                self.instant3_button.setEnabled(True)
+                self.update_light_mode()
+                QtWidgets.QApplication.restoreOverrideCursor()
 
-            filename3 = time.strftime("Gaisma_%Y%m%d-%H%M%S.txt") 
+            if job.cancelled:
+                return
 
-            if not self.collected_data3:
+            result = job.result()
+            if result is None:
                 QtWidgets.QMessageBox.warning(
                     self.main_window,
                     "No Data",
@@ -358,28 +832,14 @@ class SpectraPlotter(QtCore.QObject):
                 )
                 return
 
+            filename3 = recordings.timestamped_filename("Gaisma", job.started_at)
+            recordings.save_gaisma(filename3, result[0])
+            self.dump_profile(filename3)
 
-            with open(filename3, 'w') as f:
-                if self.collected_data3:
-                    spectra3_saved = np.array(self.collected_data3).T
-                    f.write(" #Falling light Spectra\n")
-                    for row in spectra3_saved:
-                        f.write(' '.join(map(str, row)) + '\n') 
-                
-            
-                
         except Exception as e:
             traceback.print_exc()
-            QtWidgets.QApplication.restoreOverrideCursor()
             print(f"Error saving spectra: {e}")
 
-        finally: 
-            QtWidgets.QApplication.restoreOverrideCursor()
-            self.start_reading()
-        
-
-
-
 
     def run(self):
 
@@ -391,6 +851,10 @@ class SpectraPlotter(QtCore.QObject):
             )
             return
         
+        if self.frame_server_address is not None:
+            self.frame_server = frame_server.FrameServer(self.frame_server_address)
+            self.frame_server.start()
+
         self.running = True 
         self.reading_started = True
         data_thread = threading.Thread(target=self.read_loop)
@@ -405,6 +869,11 @@ class SpectraPlotter(QtCore.QObject):
         self.running = False
         data_thread.join()
         self.ser.close()
+        if self.frame_server is not None:
+            self.frame_server.stop()
+        self.dump_profile()
+        if self.event_writer is not None:
+            self.event_writer.close()
 
         if self.ser and self.ser.is_open:
             self.ser.close()
@@ -418,5 +887,5 @@ class SpectraPlotter(QtCore.QObject):
 
 
 if __name__ == "__main__":
-    plotter = SpectraPlotter(COM_PORT, BAUD_RATE)
+    plotter = SpectraPlotter(COM_PORT, BAUD_RATE, FRAME_SERVER_ADDRESS)
     plotter.run()
@@ -0,0 +1,80 @@
+import collections
+
+import numpy as np
+
+
+# One consistent set of calibration arrays; replaced whole, never mutated
+Calibration = collections.namedtuple("Calibration", "dark reference inverse")
+
+
+class AbsorbanceConverter:
+    """Converts intensity spectra to transmittance or absorbance.
+
+    T = (S - dark) / (reference - dark) and A = -log10(T). The reciprocal
+    of the reference is computed once; pixels whose reference signal is
+    below min_signal are masked to NaN so they drop out of the plot
+    instead of blowing up.
+
+    set_dark/set_reference may run on another thread than the conversions:
+    they build a new Calibration and swap it in with one assignment, so a
+    conversion always sees a dark and reciprocal that belong together.
+    """
+
+    def __init__(self, min_signal=50.0):
+        self.min_signal = min_signal
+        self.calibration = Calibration(None, None, None)
+
+    @property
+    def dark(self):
+        return self.calibration.dark
+
+    @property
+    def reference(self):
+        return self.calibration.reference
+
+    @property
+    def inverse(self):
+        return self.calibration.inverse
+
+    @property
+    def ready(self):
+        return self.calibration.inverse is not None
+
+    def set_dark(self, dark):
+        dark = np.asarray(dark, dtype=float).copy()
+        self.calibration = self._calibrate(dark, self.calibration.reference)
+
+    def set_reference(self, reference):
+        reference = np.asarray(reference, dtype=float).copy()
+        self.calibration = self._calibrate(self.calibration.dark, reference)
+
+    def _calibrate(self, dark, reference):
+        if reference is None:
+            return Calibration(dark, None, None)
+        signal = reference - dark if dark is not None else reference.copy()
+        mask = signal < self.min_signal
+        signal[mask] = 1.0
+        inverse = np.reciprocal(signal)
+        inverse[mask] = np.nan
+        return Calibration(dark, reference, inverse)
+
+    def transmittance(self, frames, out=None):
+        # Works on one spectrum or a frames x pixels array
+        calibration = self.calibration
+        frames = np.asarray(frames, dtype=float)
+        if out is None:
+            out = np.empty_like(frames)
+        if calibration.dark is not None:
+            np.subtract(frames, calibration.dark, out=out)
+        else:
+            np.copyto(out, frames)
+        np.multiply(out, calibration.inverse, out=out)
+        return out
+
+    def absorbance(self, frames, out=None):
+        out = self.transmittance(frames, out)
+        # Non-positive transmittance (noise at the dark level) is masked too
+        out[out <= 0] = np.nan
+        np.log10(out, out=out)
+        np.negative(out, out=out)
+        return out
@@ -0,0 +1,122 @@
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size frame history with monotonic timestamps.
+
+    Frames are copied into a preallocated capacity x width array, so
+    appending never allocates and memory stays flat however long it runs.
+    """
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.width = width
+        self.data = np.zeros((capacity, width))
+        self.timestamps = np.zeros(capacity)
+        self.total = 0  # frames appended since creation / clear()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, frame, t):
+        with self._lock:
+            i = self.total % self.capacity
+            self.data[i] = frame
+            self.timestamps[i] = t
+            self.total += 1
+
+    def latest(self):
+        # (timestamp, frame copy) of the newest frame, or None
+        with self._lock:
+            if self.total == 0:
+                return None
+            i = (self.total - 1) % self.capacity
+            return self.timestamps[i], self.data[i].copy()
+
+    def snapshot(self, n=None):
+        # Oldest-first copies of the last n (default all) frames
+        with self._lock:
+            count = len(self) if n is None else min(n, len(self))
+            idx = np.arange(self.total - count, self.total) % self.capacity
+            return self.timestamps[idx], self.data[idx]
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+
+
+class _Mode:
+    def __init__(self, weight, rate):
+        self.weight = weight
+        self.rate = rate
+        self.enabled = False
+        self.next_due = 0.0
+        self.credit = 0.0
+        self.count = 0
+
+
+class ModeScheduler:
+    """Chooses which device command the reader thread issues next.
+
+    Enabled modes share the port by smooth weighted round robin. A mode with
+    a rate target (frames/s) is skipped until it is due again; without one
+    it runs as often as its weight allows.
+    """
+
+    def __init__(self):
+        self.modes = {}
+        self._lock = threading.Lock()
+
+    def add_mode(self, name, weight=1, rate=None, enabled=False):
+        with self._lock:
+            mode = self.modes[name] = _Mode(weight, rate)
+            mode.enabled = enabled
+
+    def set_enabled(self, name, enabled):
+        with self._lock:
+            mode = self.modes[name]
+            if enabled and not mode.enabled:
+                mode.next_due = 0.0
+                mode.credit = 0.0
+            mode.enabled = enabled
+
+    def set_rate(self, name, rate=None, weight=None):
+        with self._lock:
+            self.modes[name].rate = rate
+            if weight is not None:
+                self.modes[name].weight = weight
+
+    def is_enabled(self, name):
+        return self.modes[name].enabled
+
+    def next_mode(self, now):
+        # (name, 0) for the mode to read now, or (None, seconds to wait)
+        with self._lock:
+            ready = [(name, mode) for name, mode in self.modes.items()
+                     if mode.enabled and now >= mode.next_due]
+            if not ready:
+                due = [mode.next_due for mode in self.modes.values() if mode.enabled]
+                return None, (min(due) - now if due else 0.05)
+            total = 0
+            for _, mode in ready:
+                mode.credit += mode.weight
+                total += mode.weight
+            name, mode = max(ready, key=lambda item: item[1].credit)
+            mode.credit -= total
+            return name, 0
+
+    def mark(self, name, now):
+        # Record a completed read of mode name at time now
+        with self._lock:
+            mode = self.modes[name]
+            mode.count += 1
+            if mode.rate:
+                period = 1.0 / mode.rate
+                # Keep the rate on average across small delays; the first read
+                # since enabling (next_due 0.0) or one after a stall restarts
+                # the schedule from now instead of catching up in a burst
+                due = mode.next_due + period
+                mode.next_due = due if mode.next_due and due >= now else now + period
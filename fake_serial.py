@@ -0,0 +1,112 @@
+import threading
+import time
+
+import numpy as np
+
+
+# Port name that makes the plotters use FakeSerial instead of a real device
+SIMULATED_PORT = "sim"
+
+
+class SimulatedSpectrometer:
+    """Generates plausible VIS / IR / light spectra with noise and drift."""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.nm = np.linspace(340, 850, 296)
+        self.nmIR = np.linspace(640, 1050, 256)
+        self.frame = 0
+
+    def _peaks(self, nm, peaks):
+        out = np.full(nm.shape, 800.0)
+        for center, width, height in peaks:
+            out += height * np.exp(-0.5 * ((nm - center) / width) ** 2)
+        return out
+
+    def vis(self):
+        drift = 1.0 + 0.05 * np.sin(self.frame / 200.0)
+        spectrum = self._peaks(self.nm, [(450, 25, 20000 * drift), (560, 40, 30000), (700, 30, 12000)])
+        return spectrum + self.rng.normal(0, 150, self.nm.shape)
+
+    def ir(self):
+        spectrum = self._peaks(self.nmIR, [(760, 20, 15000), (880, 45, 25000)])
+        return spectrum + self.rng.normal(0, 150, self.nmIR.shape)
+
+    def light(self):
+        spectrum = self._peaks(self.nm, [(480, 60, 35000), (610, 50, 28000)])
+        return spectrum + self.rng.normal(0, 100, self.nm.shape)
+
+
+class FakeSerial:
+    """Stands in for serial.Serial and answers the device's text protocol.
+
+    Commands "5" (VIS+IR), "3" (light) and "2" (single VIS) are answered with
+    the same header lines and one value per line as the firmware.
+    frame_time emulates the integration time of a frame.
+    """
+
+    def __init__(self, frame_time=0.01, seed=None):
+        self.frame_time = frame_time
+        self.timeout = 0.1
+        self.is_open = True
+        self.device = SimulatedSpectrometer(seed)
+        self.frames_sent = 0
+        self._lines = []
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def _format(self, values):
+        return [f"{v:.2f}\n".encode('utf-8') for v in values]
+
+    def respond(self, command):
+        # Lines the device sends back for a command, or None if unknown
+        if command == "5":
+            lines = [b"Spectra:\n", b"Visible\n"] + self._format(self.device.vis())
+            lines += [b"Infrared\n"] + self._format(self.device.ir())
+        elif command == "3":
+            lines = [b"Light\n"] + self._format(self.device.light())
+        elif command == "2":
+            lines = [b"Spectra\n"] + self._format(self.device.vis())
+        elif command == "1":
+            return [b"Exposure\n"]
+        else:
+            return None
+        self.device.frame += 1
+        return lines
+
+    def write(self, data):
+        command = data.decode('utf-8').strip()
+        lines = self.respond(command)
+        if lines is not None and len(lines) > 1:
+            time.sleep(self.frame_time)
+            self.frames_sent += 1
+        with self._lock:
+            if lines:
+                self._lines = self._lines[self._pos:] + lines
+                self._pos = 0
+        return len(data)
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            return sum(len(line) for line in self._lines[self._pos:])
+
+    def readline(self):
+        with self._lock:
+            if self._pos < len(self._lines):
+                line = self._lines[self._pos]
+                self._pos += 1
+                return line
+        time.sleep(self.timeout)
+        return b""
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._lines = []
+            self._pos = 0
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
@@ -0,0 +1,237 @@
+import collections
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+# Channel ids carried in every frame
+CHANNEL_VIS = 0
+CHANNEL_IR = 1
+CHANNEL_LIGHT = 2
+CHANNEL_VIS_SINGLE = 3
+
+# Wire format: magic, sequence, timestamp (unix seconds), channel, pixel
+# count, then count little-endian float64 intensities.
+MAGIC = b"LSFR"
+HEADER = struct.Struct("<4sQdBH")
+
+Frame = collections.namedtuple("Frame", "seq timestamp channel data")
+
+
+def parse_address(text):
+    # "host:port" -> TCP tuple, anything else is a Unix socket path
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return text
+
+
+def _make_socket(address):
+    if isinstance(address, tuple):
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+
+def pack_frame(seq, timestamp, channel, data):
+    data = np.ascontiguousarray(data, dtype='<f8')
+    return HEADER.pack(MAGIC, seq, timestamp, channel, len(data)) + data.tobytes()
+
+
+class _Subscriber:
+    def __init__(self, conn, queue_size):
+        self.conn = conn
+        self.queue = collections.deque(maxlen=queue_size)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.alive = True
+
+    def push(self, packet):
+        with self.cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1  # deque drops the oldest packet
+            self.queue.append(packet)
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.alive = False
+            self.cond.notify()
+
+
+class FrameServer:
+    """Publishes frames to any number of TCP or Unix socket subscribers.
+
+    Every subscriber has its own bounded queue and sender thread. When a
+    queue is full the oldest frame is dropped, so publish() never blocks the
+    acquisition thread on a slow consumer.
+    """
+
+    def __init__(self, address, queue_size=256):
+        self.address = address
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.seq = 0
+        self.running = False
+        self._lock = threading.Lock()
+        self._sock = None
+
+    def start(self):
+        sock = _make_socket(self.address)
+        if isinstance(self.address, tuple):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        elif os.path.exists(self.address):
+            os.unlink(self.address)
+        sock.bind(self.address)
+        sock.listen()
+        if isinstance(self.address, tuple):
+            self.address = sock.getsockname()[:2]  # resolves port 0
+        self._sock = sock
+        self.running = True
+        thread = threading.Thread(target=self._accept_loop)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            sub.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            sub = _Subscriber(conn, self.queue_size)
+            with self._lock:
+                self.subscribers.append(sub)
+            thread = threading.Thread(target=self._send_loop, args=(sub,))
+            thread.daemon = True
+            thread.start()
+
+    def _send_loop(self, sub):
+        try:
+            while True:
+                with sub.cond:
+                    while sub.alive and not sub.queue:
+                        sub.cond.wait()
+                    if not sub.alive:
+                        break
+                    packet = sub.queue.popleft()
+                sub.conn.sendall(packet)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if sub in self.subscribers:
+                    self.subscribers.remove(sub)
+            sub.conn.close()
+
+    def publish(self, channel, data, seq=None, timestamp=None):
+        with self._lock:
+            if seq is None:
+                seq = self.seq
+                self.seq += 1
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return
+        packet = pack_frame(seq, time.time() if timestamp is None else timestamp, channel, data)
+        for sub in subscribers:
+            sub.push(packet)
+
+    def dropped(self):
+        with self._lock:
+            return sum(sub.dropped for sub in self.subscribers)
+
+
+class FrameClient:
+    """Subscribes to a FrameServer and yields Frame tuples."""
+
+    def __init__(self, address, timeout=None):
+        self.sock = _make_socket(address)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+
+    def _recv_exact(self, size):
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.sock.recv(size - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return bytes(buf)
+
+    def recv(self):
+        # Next frame, or None once the server has closed the connection
+        header = self._recv_exact(HEADER.size)
+        if header is None:
+            return None
+        magic, seq, timestamp, channel, count = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Frame stream out of sync")
+        payload = self._recv_exact(count * 8)
+        if payload is None:
+            return None
+        return Frame(seq, timestamp, channel, np.frombuffer(payload, dtype='<f8'))
+
+    def __iter__(self):
+        while True:
+            frame = self.recv()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        self.sock.close()
+
+
+def simulate(address, frame_time=0.01):
+    # Serve simulated VIS+IR frames without a device or GUI
+    import fake_serial
+    device = fake_serial.SimulatedSpectrometer()
+    server = FrameServer(address)
+    server.start()
+    print(f"Publishing simulated frames on {server.address}")
+    seq = 0
+    try:
+        while True:
+            timestamp = time.time()
+            server.publish(CHANNEL_VIS, device.vis(), seq, timestamp)
+            server.publish(CHANNEL_IR, device.ir(), seq, timestamp)
+            device.frame += 1
+            seq += 1
+            time.sleep(frame_time)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    # python frame_server.py 127.0.0.1:5555            print received frames
+    # python frame_server.py --simulate 127.0.0.1:5555 publish simulated frames
+    if len(sys.argv) == 3 and sys.argv[1] == "--simulate":
+        simulate(parse_address(sys.argv[2]))
+    elif len(sys.argv) == 2:
+        client = FrameClient(parse_address(sys.argv[1]))
+        for frame in client:
+            print(f"{frame.seq} {frame.timestamp:.3f} ch{frame.channel} "
+                  f"n={len(frame.data)} max={frame.data.max():.1f}")
+    else:
+        print("usage: frame_server.py [--simulate] HOST:PORT|SOCKET_PATH")
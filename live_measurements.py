@@ -7,12 +7,21 @@ from pyqtgraph.Qt import QtWidgets, QtCore
 import traceback
 import threading
 
+import fake_serial
+import scheduler
+
 # Serial port configuration
 COM_PORT = "COM5"  # Replace with your actual COM port
 BAUD_RATE = 2000000
 
-class SpectraPlotter:
+class SpectraPlotter(QtCore.QObject):
+    # Batch capture progress (frames written, elapsed seconds) and completion,
+    # emitted from the reader thread
+    capture_progress = QtCore.Signal(int, float, float)
+    capture_done = QtCore.Signal(object)
+
     def __init__(self, com_port, baud_rate):
+        super().__init__()
         self.com_port = com_port
         self.baud_rate = baud_rate
         self.ser = None
@@ -55,6 +64,8 @@ class SpectraPlotter:
         self.stop_button.clicked.connect(self.stop_reading)
         self.save_button.clicked.connect(self.save_spectra)
         self.exposure_button.clicked.connect(self.set_exposure)
+        self.capture_progress.connect(self.update_capture_progress)
+        self.capture_done.connect(self.finish_capture)
 
         # Initialization
         self.data_array = np.zeros(296)
@@ -64,9 +75,19 @@ class SpectraPlotter:
         self.ser_lock = threading.Lock()
         self.data_lock = threading.Lock()
         self.latest_spectrum = None
+        self.scheduler = scheduler.MeasurementScheduler()
+        self.capture_job = None
+        self.capture_file = None
+        self.capture_lock = threading.Lock()
+        self.capture_dialog = None
+        self.capture_last_progress = 0.0
+        self.capture_error = None
         self.main_window.show()
 
     def connect_serial(self):
+        if self.com_port == fake_serial.SIMULATED_PORT:
+            self.ser = fake_serial.FakeSerial()
+            return True
         try:
             self.ser = serial.Serial(self.com_port, self.baud_rate, timeout=0.1)
             return True
@@ -136,6 +157,10 @@ class SpectraPlotter:
 
 
     def read_spectra(self):
+        with self.ser_lock:
+            return self._read_spectra()
+
+    def _read_spectra(self):
         start_command = "2"
         self.ser.write(start_command.encode('utf-8'))  
         time.sleep(0.01)
@@ -176,23 +201,35 @@ class SpectraPlotter:
     def read_loop(self):
         # Background thread loop for reading spectra continuously
         while self.running:
-            if self.reading_started:
+            if self.scheduler.active:
+                # Batch capture: frames go straight to the output file
+                spectrum = self.read_spectra()
+                if spectrum is not None:
+                    with self.data_lock:
+                        self.latest_spectrum = spectrum
+                    self.scheduler.offer(time.monotonic(), spectrum)
+            elif self.reading_started:
                 spectrum = self.read_spectra()
                 if spectrum is not None:
                     with self.data_lock:
                         self.latest_spectrum = spectrum
                     self.colleted_data.append(spectrum)
+            else:
+                time.sleep(0.05)
 
 
     def update_plot(self):
         # Called periodically by QTimer to update plot
-        if self.reading_started:
+        if self.reading_started or self.capture_job is not None:
             with self.data_lock:
                 if self.latest_spectrum is not None:
                     self.curve.setData(self.nm, self.latest_spectrum)
 
     def save_spectra(self):
         try:
+            if self.capture_job is not None:
+                return
+
             # Ask user for the number of measurements
             count, ok = QtWidgets.QInputDialog.getInt(
                 self.main_window,
@@ -215,28 +252,92 @@ class SpectraPlotter:
             if not filename:
                 return
 
-            measurements = []
-
-            QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
-            for i in range(count):
-                spectrum = self.read_spectra()
-                if spectrum is not None:
-                    measurements.append(spectrum)
-                #time.sleep(0.001)  # Adjust delay if needed
+            self.capture_file = open(filename, 'w')
+            self.capture_last_progress = 0.0
+            self.capture_error = None
 
-            with open(filename, 'w') as f:
-                for spectrum in measurements:
-                    if spectrum is not None:
-                        f.write(','.join(map(str, spectrum)) + '\n')
-                        f.write('---\n') 
+            self.capture_dialog = QtWidgets.QProgressDialog(
+                "Starting measurement...", "Cancel", 0, 1000, self.main_window)
+            self.capture_dialog.setWindowTitle("Measurement")
+            self.capture_dialog.setWindowModality(QtCore.Qt.WindowModal)
+            self.capture_dialog.setMinimumDuration(0)
+            self.capture_dialog.canceled.connect(self.cancel_capture)
+            self.capture_dialog.show()
 
-            QtWidgets.QApplication.restoreOverrideCursor()
+            # The reader thread runs the capture at full device rate
+            self.capture_job = scheduler.FrameCountJob(count, keep=False, on_frame=self.write_capture_frame)
+            self.scheduler.submit(self.capture_job, self.capture_done.emit)
 
         except Exception as e:
-            QtWidgets.QApplication.restoreOverrideCursor()
+            if self.capture_file is not None:
+                self.capture_file.close()
+                self.capture_file = None
             traceback.print_exc()
             print(f"Error saving spectra: {e}")
 
+    def write_capture_frame(self, t, frame):
+        # Reader thread: write one spectrum and report progress at ~10 Hz
+        job = self.capture_job
+        try:
+            with self.capture_lock:
+                if self.capture_file is None:
+                    return
+                self.capture_file.write(','.join(map(str, frame[0])) + '\n')
+                self.capture_file.write('---\n')
+        except OSError as e:
+            # Disk full or similar: stop the capture instead of the reader
+            # thread; capture_done lets finish_capture close and report
+            self.capture_error = e
+            if job is not None:
+                self.scheduler.cancel(job)
+            return
+        if job is None:
+            return
+        if job.count == job.target or t - self.capture_last_progress >= 0.1:
+            self.capture_last_progress = t
+            self.capture_progress.emit(job.count, job.progress(), t - job.start_time)
+
+    def update_capture_progress(self, done, fraction, elapsed):
+        if self.capture_dialog is None or self.capture_job is None:
+            return
+        total = self.capture_job.target
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else 0.0
+        # setValue() on a modal dialog pumps the event loop and can run
+        # finish_capture, which clears self.capture_dialog
+        dialog = self.capture_dialog
+        dialog.setLabelText(
+            f"{done} / {total} spectra\n{rate:.1f} spectra/s, {eta:.0f} s remaining")
+        dialog.setValue(int(fraction * 1000))
+
+    def cancel_capture(self):
+        if self.capture_job is not None:
+            self.scheduler.cancel(self.capture_job)
+
+    def finish_capture(self, job):
+        if job is not self.capture_job:
+            return  # already finished, e.g. cancelled by a write error
+        error = None
+        try:
+            with self.capture_lock:
+                if self.capture_file is not None:
+                    self.capture_file.close()
+                self.capture_file = None
+        except Exception as e:
+            traceback.print_exc()
+            error = e
+        finally:
+            self.capture_job = None
+            if self.capture_dialog is not None:
+                self.capture_dialog.canceled.disconnect(self.cancel_capture)
+                self.capture_dialog.close()
+                self.capture_dialog = None
+        error = self.capture_error or error
+        self.capture_error = None
+        if error is not None:
+            print(f"Error saving spectra: {error}")
+            QtWidgets.QMessageBox.warning(self.main_window, "Save Error", f"Error saving spectra: {error}")
+
     def run(self):
         if not self.connect_serial():
             return
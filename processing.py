@@ -0,0 +1,153 @@
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+import recordings
+
+
+# Matrices are cached per axis length (296 VIS / 256 IR), so one pipeline
+# serves both channels and nothing is rebuilt per frame.
+
+@lru_cache(maxsize=None)
+def savgol_matrix(length, window, order):
+    # Savitzky-Golay smoothing as a length x length matrix. Edge pixels use
+    # the polynomial fitted to the first/last full window.
+    if window % 2 == 0 or window <= order:
+        raise ValueError("window must be odd and larger than order")
+    window = min(window, length - (length + 1) % 2)
+    half = window // 2
+    x = np.arange(-half, half + 1)
+    fit = np.linalg.pinv(np.vander(x, order + 1, increasing=True))
+
+    S = np.zeros((length, length))
+    center = fit[0]
+    for i in range(half, length - half):
+        S[i, i - half:i + half + 1] = center
+    for i in range(half):
+        S[i, :window] = np.vander([i - half], order + 1, increasing=True) @ fit
+        S[length - 1 - i, length - window:] = np.vander([half - i], order + 1, increasing=True) @ fit
+    S.flags.writeable = False
+    return S
+
+
+@lru_cache(maxsize=None)
+def baseline_matrix(length, order):
+    # Least-squares polynomial baseline removal: I - X pinv(X)
+    X = np.vander(np.linspace(-1, 1, length), order + 1, increasing=True)
+    P = np.eye(length) - X @ np.linalg.pinv(X)
+    P.flags.writeable = False
+    return P
+
+
+class SavitzkyGolay:
+    linear = True
+
+    def __init__(self, window=11, order=3):
+        self.window = window
+        self.order = order
+
+    def matrix(self, length):
+        return savgol_matrix(length, self.window, self.order)
+
+
+class PolynomialBaseline:
+    linear = True
+
+    def __init__(self, order=2):
+        self.order = order
+
+    def matrix(self, length):
+        return baseline_matrix(length, self.order)
+
+
+class Normalize:
+    linear = False
+
+    def __init__(self, method="max"):
+        if method not in ("max", "area", "l2"):
+            raise ValueError(f"Unknown normalization: {method}")
+        self.method = method
+
+    def apply(self, frames):
+        if self.method == "max":
+            scale = np.max(np.abs(frames), axis=-1, keepdims=True)
+        elif self.method == "area":
+            scale = np.abs(np.sum(frames, axis=-1, keepdims=True))
+        else:
+            scale = np.linalg.norm(frames, axis=-1, keepdims=True)
+        scale[scale == 0] = 1.0
+        return frames / scale
+
+
+class Pipeline:
+    """Chain of processing stages applied along the last (pixel) axis.
+
+    Consecutive linear stages are fused into one matrix per axis length, so a
+    frame, or a whole recording, costs one matrix product per linear run.
+    """
+
+    def __init__(self, *stages):
+        self.stages = tuple(stages)
+        self._plans = {}
+
+    def then(self, stage):
+        return Pipeline(*self.stages, stage)
+
+    def _plan(self, length):
+        plan = self._plans.get(length)
+        if plan is None:
+            plan = []
+            fused = None
+            for stage in self.stages:
+                if stage.linear:
+                    M = stage.matrix(length)
+                    fused = M if fused is None else M @ fused
+                    continue
+                if fused is not None:
+                    plan.append(np.ascontiguousarray(fused.T))
+                    fused = None
+                plan.append(stage)
+            if fused is not None:
+                plan.append(np.ascontiguousarray(fused.T))
+            self._plans[length] = plan
+        return plan
+
+    def process(self, frame):
+        return self.process_batch(np.asarray(frame, dtype=float)[np.newaxis])[0]
+
+    def process_batch(self, frames, chunk_size=65536):
+        # frames: frames x pixels. Chunked only to bound temporary memory.
+        frames = np.asarray(frames, dtype=float)
+        if frames.ndim != 2:
+            raise ValueError("process_batch expects a 2-D frames x pixels array")
+        plan = self._plan(frames.shape[1])
+        out = np.empty_like(frames)
+        for start in range(0, len(frames), chunk_size):
+            block = frames[start:start + chunk_size]
+            for step in plan:
+                block = block @ step if isinstance(step, np.ndarray) else step.apply(block)
+            out[start:start + chunk_size] = block
+        return out
+
+
+def default_pipeline():
+    return Pipeline(SavitzkyGolay(11, 3), PolynomialBaseline(2), Normalize("max"))
+
+
+def process_file(filename, pipeline=None):
+    # Batch-process a Spektri_*.txt recording into <name>_processed.txt
+    pipeline = pipeline or default_pipeline()
+    vis, ir = recordings.load_spektri(filename)
+    if vis is not None:
+        vis = pipeline.process_batch(vis)
+    if ir is not None:
+        ir = pipeline.process_batch(ir)
+    out = filename[:-4] + "_processed.txt" if filename.endswith(".txt") else filename + "_processed"
+    recordings.save_spektri(out, vis, ir)
+    return out
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:]:
+        print(process_file(name))
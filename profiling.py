@@ -0,0 +1,175 @@
+import collections
+import contextlib
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+
+# LIVESPECTRA_PROFILE=1 turns on timing spans at start-up, =capture also
+# takes a cProfile/tracemalloc snapshot for LIVESPECTRA_PROFILE_WINDOW s.
+ENV_VAR = "LIVESPECTRA_PROFILE"
+WINDOW_ENV_VAR = "LIVESPECTRA_PROFILE_WINDOW"
+
+
+class Profiler:
+    """Timing spans for the hot path plus an optional bounded deep capture.
+
+    When disabled, wrapped functions and spans cost one attribute check.
+    Only the last max_samples durations per span are kept for percentiles.
+    """
+
+    def __init__(self, enabled=False, window=30.0, max_samples=10000):
+        self.enabled = enabled
+        self.window = window
+        self.max_samples = max_samples
+        self.spans = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._capture_lock = threading.RLock()
+        self._cprofile = None
+        self._capture_end = None
+        self._capture_stats = None
+        self._tracemalloc_top = None
+        self._owns_tracemalloc = False  # tracing was started by start_capture
+
+    @classmethod
+    def from_environment(cls):
+        mode = os.environ.get(ENV_VAR, "").lower()
+        try:
+            window = float(os.environ.get(WINDOW_ENV_VAR, 30))
+        except ValueError:
+            print(f"Ignoring invalid {WINDOW_ENV_VAR}, using 30 s")
+            window = 30.0
+        profiler = cls(enabled=mode not in ("", "0", "off"), window=window)
+        if mode == "capture":
+            profiler.start_capture()
+        return profiler
+
+    def record(self, name, duration):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = [0, 0.0, collections.deque(maxlen=self.max_samples)]
+            span[0] += 1
+            span[1] += duration
+            span[2].append(duration)
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def span(self, name):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed(name)
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                if self._cprofile is not None and not getattr(self._local, "inside", False):
+                    return self._profiled_call(func, args, kwargs)
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, obj, *names):
+        # Replace obj.<name> with timed wrappers; do this before connecting
+        # the methods to Qt signals or threads
+        for name in names:
+            setattr(obj, name, self.wrap(name, getattr(obj, name)))
+
+    def _profiled_call(self, func, args, kwargs):
+        # cProfile objects are not re-entrant: one thread at a time runs
+        # under the profiler, the others run untraced instead of waiting
+        if not self._capture_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            prof = self._cprofile
+            if prof is None:
+                return func(*args, **kwargs)
+            if time.monotonic() >= self._capture_end:
+                self._finish_capture()
+                return func(*args, **kwargs)
+            self._local.inside = True
+            try:
+                return prof.runcall(func, *args, **kwargs)
+            finally:
+                self._local.inside = False
+        finally:
+            self._capture_lock.release()
+
+    def start_capture(self, window=None):
+        with self._capture_lock:
+            self.enabled = True
+            self._cprofile = cProfile.Profile()
+            self._capture_end = time.monotonic() + (window or self.window)
+            self._capture_stats = None
+            self._tracemalloc_top = None
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+
+    def stop_capture(self):
+        with self._capture_lock:
+            self._finish_capture()
+
+    def _finish_capture(self):
+        if self._cprofile is None:
+            return
+        out = io.StringIO()
+        try:
+            pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(40)
+            self._capture_stats = out.getvalue()
+        except TypeError:
+            # pstats refuses a profile that never ran a call
+            self._capture_stats = "No calls profiled during the capture window\n"
+        self._cprofile = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            # Leave tracing running for whoever else started it
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+            self._tracemalloc_top = [str(stat) for stat in snapshot.statistics("lineno")[:25]]
+
+    def report(self):
+        lines = [f"{'span':24s} {'count':>8s} {'total s':>9s} {'mean ms':>9s} "
+                 f"{'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s}"]
+        with self._lock:
+            spans = {name: (count, total, np.array(samples)) for name, (count, total, samples) in self.spans.items()}
+        for name, (count, total, samples) in sorted(spans.items()):
+            p50, p95 = np.percentile(samples, [50, 95]) * 1000
+            lines.append(f"{name:24s} {count:8d} {total:9.3f} {total / count * 1000:9.3f} "
+                         f"{p50:9.3f} {p95:9.3f} {samples.max() * 1000:9.3f}")
+        if self._capture_stats:
+            lines += ["", "cProfile (cumulative)", self._capture_stats]
+        if self._tracemalloc_top:
+            lines += ["", "tracemalloc top allocations"] + self._tracemalloc_top
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        self.stop_capture()
+        with open(filename, 'w') as f:
+            f.write(time.strftime("# Profile %Y-%m-%d %H:%M:%S\n"))
+            f.write(self.report())
+        return filename
+
+    def reset(self):
+        with self._lock:
+            self.spans = {}
@@ -0,0 +1,121 @@
+import os
+import time
+
+import numpy as np
+
+
+# Section headers written by V7_0.py
+VIS_HEADER = " #Visible Spectra"
+IR_HEADER = " #Infrared Spectra"
+LIGHT_HEADER = " #Falling light Spectra"
+STITCHED_HEADER = " #Stitched Spectra"
+
+
+def read_sections(filename):
+    # Spektri_*/Gaisma_* files: a header line per section, then one row per
+    # pixel with one column per frame. Returns {header: frames x pixels}.
+    sections = {}
+    header = None
+    rows = []
+    with open(filename) as f:
+        for line in f:
+            if line.lstrip().startswith('#'):
+                if header is not None:
+                    sections[header] = _to_frames(rows)
+                header = line.rstrip('\n')
+                rows = []
+            elif line.strip():
+                rows.append(line)
+    if header is not None:
+        sections[header] = _to_frames(rows)
+    return sections
+
+
+def _to_frames(rows):
+    if not rows:
+        return np.empty((0, 0))
+    return np.loadtxt(rows, ndmin=2).T
+
+
+def write_sections(filename, sections):
+    # sections: list of (header, frames) with frames as frames x pixels
+    with open(filename, 'w') as f:
+        for header, frames in sections:
+            if frames is None or len(frames) == 0:
+                continue
+            f.write(header + '\n')
+            for row in np.asarray(frames).T:
+                f.write(' '.join(map(str, row)) + '\n')
+
+
+def load_spektri(filename):
+    sections = read_sections(filename)
+    return sections.get(VIS_HEADER), sections.get(IR_HEADER)
+
+
+def save_spektri(filename, vis, ir):
+    write_sections(filename, [(VIS_HEADER, vis), (IR_HEADER, ir)])
+
+
+def load_gaisma(filename):
+    return read_sections(filename).get(LIGHT_HEADER)
+
+
+def save_gaisma(filename, light):
+    write_sections(filename, [(LIGHT_HEADER, light)])
+
+
+def load_measurements(filename):
+    # live_measurements.py / livePlotV1_5.py: one comma separated spectrum
+    # per line, each followed by a '---' separator line
+    rows = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line and line != '---':
+                rows.append(np.array(line.split(','), dtype=float))
+    return np.array(rows) if rows else None
+
+
+def save_binary(filename, timestamps=None, **channels):
+    # Binary recording: one frames x pixels array per channel ("vis", "ir",
+    # "light") plus optional per-frame monotonic timestamps
+    arrays = {name: np.asarray(frames) for name, frames in channels.items() if frames is not None}
+    if timestamps is not None:
+        arrays["timestamps"] = np.asarray(timestamps, dtype=float)
+    np.savez(filename, **arrays)
+
+
+def load_binary(filename):
+    with np.load(filename) as data:
+        return {name: data[name] for name in data.files}
+
+
+def timestamped_filename(prefix, wall_time, extension=".txt"):
+    # <prefix>_YYYYmmdd-HHMMSS-mmm<extension>, with a counter appended when
+    # a capture started in the same millisecond already took that name
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(wall_time))
+    base = f"{prefix}_{stamp}-{int(wall_time % 1 * 1000):03d}"
+    filename = base + extension
+    n = 1
+    while os.path.exists(filename):
+        filename = f"{base}_{n}{extension}"
+        n += 1
+    return filename
+
+
+def load_recording(filename):
+    # Any supported recording as {"vis", "ir", "light", "timestamps"} entries
+    if filename.endswith(".npz"):
+        return load_binary(filename)
+    with open(filename) as f:
+        first = f.readline()
+    if not first.lstrip().startswith('#'):
+        return {"vis": load_measurements(filename)}
+    sections = read_sections(filename)
+    recording = {
+        "vis": sections.get(VIS_HEADER),
+        "ir": sections.get(IR_HEADER),
+        "light": sections.get(LIGHT_HEADER),
+    }
+    return {name: frames for name, frames in recording.items() if frames is not None}
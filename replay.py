@@ -0,0 +1,191 @@
+import argparse
+import time
+
+import numpy as np
+
+import fake_serial
+import recordings
+
+
+class ReplaySerial(fake_serial.FakeSerial):
+    """Serial stand-in that answers device commands from a recording.
+
+    speed is the playback rate: 1.0 is real time, N is N times faster and
+    None plays as fast as the reader asks. Recordings without timestamps
+    (the text formats) are paced at frame_period seconds per frame.
+    """
+
+    def __init__(self, recording, speed=1.0, frame_period=0.1, loop=False):
+        super().__init__(frame_time=0)
+        if isinstance(recording, str):
+            recording = recordings.load_recording(recording)
+        self.vis = recording.get("vis")
+        self.ir = recording.get("ir")
+        self.light = recording.get("light")
+        lengths = [len(frames) for frames in (self.vis, self.ir, self.light) if frames is not None]
+        if not lengths:
+            raise ValueError("Recording contains no spectra")
+        self.length = max(lengths)
+
+        timestamps = recording.get("timestamps")
+        if timestamps is None:
+            timestamps = np.arange(self.length) * frame_period
+        self.offsets = np.asarray(timestamps, dtype=float) - timestamps[0]
+        self.speed = speed
+        self.loop = loop
+        self.index = {"5": 0, "3": 0, "2": 0}
+        self.finished = False
+        self._start = None
+
+    @property
+    def modes(self):
+        # Device commands the recording has data for
+        available = []
+        if self.vis is not None and self.ir is not None:
+            available.append("5")
+        if self.light is not None:
+            available.append("3")
+        if self.vis is not None:
+            available.append("2")
+        return available
+
+    @property
+    def mode(self):
+        # Device command that plays the recording: VIS+IR, light or VIS only
+        if self.vis is not None and self.ir is not None:
+            return "5"
+        return "3" if self.light is not None else "2"
+
+    def _missing(self):
+        # No data for this command: behave like an idle port, not a busy loop
+        time.sleep(self.timeout)
+        return None
+
+    def _next(self, command, frames):
+        if frames is None:
+            return self._missing()
+        i = self.index[command]
+        if i >= len(frames):
+            if not self.loop:
+                self.finished = True
+                return None
+            i = 0
+            self._start = None
+        self.index[command] = i + 1
+        self._pace(i)
+        return frames[i]
+
+    def _pace(self, i):
+        if not self.speed:
+            return
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now - self.offsets[i] / self.speed
+        delay = self._start + self.offsets[i] / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def respond(self, command):
+        if command == "5":
+            if self.vis is None or self.ir is None:
+                return self._missing()
+            i = self.index["5"]
+            vis = self._next("5", self.vis)
+            if vis is None:
+                return None
+            ir = self.ir[i % len(self.ir)]
+            lines = [b"Spectra:\n", b"Visible\n"] + self._format(vis)
+            return lines + [b"Infrared\n"] + self._format(ir)
+        if command == "3":
+            light = self._next("3", self.light)
+            return None if light is None else [b"Light\n"] + self._format(light)
+        if command == "2":
+            vis = self._next("2", self.vis)
+            return None if vis is None else [b"Spectra\n"] + self._format(vis)
+        return super().respond(command)
+
+    def write(self, data):
+        written = super().write(data)
+        if self.finished:
+            time.sleep(self.timeout)  # behave like an idle port, not a busy loop
+        return written
+
+
+def enable_mode(plotter, ser):
+    # Run the recording's main mode; controls for modes without data are off
+    for mode in ("5", "3", "2"):
+        plotter.set_mode_available(mode, mode in ser.modes)
+    mode = ser.mode
+    if mode == "3":
+        plotter.light_check.setChecked(True)
+    elif mode == "2":
+        plotter.single_check.setChecked(True)
+
+
+def _read_frame(plotter, mode):
+    # (x, spectrum) pairs of one frame read through mode, or None
+    if mode == "5":
+        spectra_ready, IRspectra_ready = plotter.read_spectra()
+        if not (spectra_ready and IRspectra_ready):
+            return None
+        return [(plotter.curve, plotter.nm, plotter.data_array),
+                (plotter.curveIR, plotter.nmIR, plotter.data_arrayIR)]
+    if mode == "3":
+        return [(plotter.curve3, plotter.nm, plotter.data_array3)] if plotter.read_spectra3() else None
+    return [(plotter.curve2, plotter.nm, plotter.data_array2)] if plotter.read_spectra2() else None
+
+
+def benchmark(filename, frames=None):
+    # Read, process and render a recording as fast as possible, no device
+    import V7_0
+    from pyqtgraph.Qt import QtWidgets
+
+    ser = ReplaySerial(filename, speed=None, loop=True)
+    plotter = V7_0.SpectraPlotter(filename, 0, ser=ser)
+    frames = frames or ser.length
+    timings = {"read": 0.0, "process": 0.0, "render": 0.0}
+    done = 0
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        channels = _read_frame(plotter, ser.mode)
+        t1 = time.perf_counter()
+        if channels is None:
+            break
+        processed = [plotter.pipeline.process(data) for _, _, data in channels]
+        t2 = time.perf_counter()
+        for (curve, nm, _), spectra in zip(channels, processed):
+            curve.setData(nm, spectra)
+        QtWidgets.QApplication.processEvents()
+        t3 = time.perf_counter()
+        timings["read"] += t1 - t0
+        timings["process"] += t2 - t1
+        timings["render"] += t3 - t2
+        done += 1
+    for stage, total in timings.items():
+        rate = done / total if total else float('inf')
+        print(f"{stage:8s} {done} frames  {total:.3f} s  {rate:.0f} frames/s")
+    plotter.main_window.close()
+    if not done:
+        raise RuntimeError(f"No frames could be read from {filename} (mode {ser.mode})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recording through the live plotter")
+    parser.add_argument("recording", help="Spektri_/Gaisma_ text file, measurement file or .npz")
+    parser.add_argument("--speed", default="1",
+                        help="playback speed: 1 = real time, N = N times faster, max = as fast as possible")
+    parser.add_argument("--frame-period", type=float, default=0.1,
+                        help="seconds per frame for recordings without timestamps")
+    parser.add_argument("--loop", action="store_true", help="restart at the end of the recording")
+    parser.add_argument("--bench", action="store_true", help="measure read/process/render throughput")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.recording)
+    else:
+        import V7_0
+        speed = None if args.speed == "max" else float(args.speed)
+        ser = ReplaySerial(args.recording, speed, args.frame_period, args.loop)
+        plotter = V7_0.SpectraPlotter(args.recording, 0, V7_0.FRAME_SERVER_ADDRESS, ser=ser)
+        enable_mode(plotter, ser)
+        plotter.run()
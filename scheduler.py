@@ -0,0 +1,206 @@
+import datetime
+import threading
+import time
+
+import numpy as np
+
+
+class MeasurementJob:
+    """A capture window evaluated on the acquisition thread, frame by frame.
+
+    Frames are offered with their monotonic timestamp; the first frame at or
+    after not_before starts the job, so start and stop are exact to the
+    frame. With keep=False frames are only passed to on_frame (e.g. written
+    straight to a file) instead of being collected in memory.
+    """
+
+    def __init__(self, keep=True, on_frame=None):
+        self.keep = keep
+        self.on_frame = on_frame
+        self.not_before = None
+        self.source = None  # acquisition mode the job takes frames from
+        self.start_time = None  # monotonic timestamp of the first frame
+        self.started_at = None  # wall clock time of the first frame
+        self.frames = []
+        self.count = 0
+        self.finished = False
+        self.cancelled = False
+        self.consumed = False
+
+    def offer(self, t, frame):
+        # Returns the measurements completed by this frame
+        self.consumed = False
+        if self.finished:
+            return []
+        if self.start_time is None:
+            if self.not_before is not None and t < self.not_before:
+                return []
+            self.start_time = t
+            self.started_at = time.time()
+        if self.expired(t):
+            self.finished = True
+            return [self]
+        self.consumed = True
+        self.count += 1
+        if self.keep:
+            self.frames.append(frame)
+        if self.on_frame is not None:
+            self.on_frame(t, frame)
+        if self.complete():
+            self.finished = True
+            return [self]
+        return []
+
+    def expired(self, t):
+        return False
+
+    def complete(self):
+        return False
+
+    def progress(self):
+        # Fraction done, or None when unknown
+        return None
+
+    def result(self):
+        # One frames x pixels array per channel of the offered frames
+        if not self.frames:
+            return None
+        return tuple(np.array(channel) for channel in zip(*self.frames))
+
+
+class FrameCountJob(MeasurementJob):
+    def __init__(self, frames, **kwargs):
+        super().__init__(**kwargs)
+        self.target = frames
+
+    def complete(self):
+        return self.count >= self.target
+
+    def progress(self):
+        return self.count / self.target
+
+
+class DurationJob(MeasurementJob):
+    # Frames with start <= t < start + seconds
+    def __init__(self, seconds, **kwargs):
+        super().__init__(**kwargs)
+        self.seconds = seconds
+        self.last_t = None
+
+    def expired(self, t):
+        self.last_t = t
+        return t - self.start_time >= self.seconds
+
+    def progress(self):
+        if self.last_t is None:
+            return 0.0
+        return min((self.last_t - self.start_time) / self.seconds, 1.0)
+
+
+class RepeatJob(MeasurementJob):
+    """Runs make_job() every interval seconds, repetitions times.
+
+    Each repetition is reported as its own completed measurement.
+    """
+
+    def __init__(self, interval, repetitions, make_job):
+        super().__init__(keep=False)
+        self.interval = interval
+        self.repetitions = repetitions
+        self.make_job = make_job
+        self.started = 0
+        self.current = None
+
+    def offer(self, t, frame):
+        if self.finished:
+            return []
+        if self.start_time is None:
+            if self.not_before is not None and t < self.not_before:
+                return []
+            self.start_time = t
+            self.started_at = time.time()
+        done = []
+        while True:
+            if self.current is None:
+                if self.started == self.repetitions:
+                    self.finished = True
+                    break
+                self.current = self.make_job()
+                self.current.not_before = self.start_time + self.started * self.interval
+                self.started += 1
+            done += self.current.offer(t, frame)
+            if not self.current.finished:
+                break
+            consumed = self.current.consumed
+            self.count += 1
+            self.current = None
+            if consumed:
+                if self.started == self.repetitions:
+                    self.finished = True
+                break
+        return done
+
+    def progress(self):
+        return self.count / self.repetitions
+
+
+def monotonic_at(hour, minute=0, second=0):
+    # Monotonic timestamp of the next occurrence of a wall clock time of day
+    now = datetime.datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+    if target <= now:
+        target += datetime.timedelta(days=1)
+    return time.monotonic() + (target - now).total_seconds()
+
+
+def at_time_of_day(job, hour, minute=0, second=0):
+    job.not_before = monotonic_at(hour, minute, second)
+    return job
+
+
+class MeasurementScheduler:
+    """Runs submitted jobs against the frames of the acquisition thread.
+
+    on_done(job) is called from the acquisition thread for every completed
+    measurement; GUI code should forward it through a Qt signal.
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, job, on_done=None, source=None):
+        job.source = source
+        with self._lock:
+            self.jobs.append((job, on_done))
+        return job
+
+    def cancel(self, job=None):
+        # Cancel one job, or all of them
+        with self._lock:
+            cancelled = [entry for entry in self.jobs if job is None or entry[0] is job]
+            self.jobs = [entry for entry in self.jobs if entry not in cancelled]
+        for cancelled_job, on_done in cancelled:
+            cancelled_job.cancelled = True
+            cancelled_job.finished = True
+            if on_done is not None:
+                on_done(cancelled_job)
+
+    @property
+    def active(self):
+        return bool(self.jobs)
+
+    def offer(self, t, *frame, source=None):
+        if not self.jobs:
+            return
+        with self._lock:
+            jobs = [entry for entry in self.jobs if entry[0].source == source]
+        for job, on_done in jobs:
+            done = job.offer(t, frame)
+            if job.finished:
+                with self._lock:
+                    if (job, on_done) in self.jobs:
+                        self.jobs.remove((job, on_done))
+            if on_done is not None:
+                for measurement in done:
+                    on_done(measurement)
@@ -0,0 +1,228 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+# Headless unless a display platform is chosen explicitly
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import fake_serial
+import V7_0
+from pyqtgraph.Qt import QtCore
+
+
+def rss_mb():
+    # Current resident set size; falls back to the peak where /proc is missing
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class SoakRun:
+    """Runs SpectraPlotter against FakeSerial and samples its health.
+
+    Every sample window records RSS, traced memory, acquisition latency
+    (one read_loop pass for the VIS+IR mode), display latency (age of the
+    newest frame when update_plot draws it) and frames lost between the
+    device and the ring buffers.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        # Trace before the plotter exists, so a profiler capture started from
+        # LIVESPECTRA_PROFILE finds tracing on and leaves it running
+        tracemalloc.start(args.trace_depth)
+        self.ser = fake_serial.FakeSerial(frame_time=args.frame_time, seed=0)
+        self.plotter = V7_0.SpectraPlotter(fake_serial.SIMULATED_PORT, 0, ser=self.ser)
+        self.samples = []
+        self.window_acquire = []
+        self.window_display = []
+        self.baseline_snapshot = None
+        self.started = None
+        self.failures = []
+
+        acquire = self.plotter.acquire["5"]
+
+        def timed_acquire():
+            start = time.perf_counter()
+            acquire()
+            self.window_acquire.append(time.perf_counter() - start)
+
+        self.plotter.acquire["5"] = timed_acquire
+
+        update_plot = self.plotter.update_plot
+
+        def timed_update_plot():
+            latest = self.plotter.buffer.latest()
+            update_plot()
+            if latest is not None:
+                self.window_display.append(time.monotonic() - latest[0])
+
+        self.plotter.update_plot = timed_update_plot
+
+    def frames_received(self):
+        p = self.plotter
+        return p.buffer.total + p.buffer3.total + p.buffer2.total
+
+    def sample(self):
+        # Both frame counters first, before anything slow lets more frames in
+        sent = self.ser.frames_sent
+        received = self.frames_received()
+        elapsed = time.monotonic() - self.started
+        acquire = np.array(self.window_acquire) * 1000
+        display = np.array(self.window_display) * 1000
+        self.window_acquire = []
+        self.window_display = []
+        traced, _ = tracemalloc.get_traced_memory()
+        sample = {
+            "t": elapsed,
+            "rss": rss_mb(),
+            "traced": traced / 2**20,
+            "frames": len(acquire),
+            "acq_p50": np.percentile(acquire, 50) if len(acquire) else np.nan,
+            "acq_p99": np.percentile(acquire, 99) if len(acquire) else np.nan,
+            "disp_p99": np.percentile(display, 99) if len(display) else np.nan,
+            "dropped": sent - received,
+            "sent": sent,
+        }
+        self.samples.append(sample)
+        print(f"{sample['t']:8.0f} {sample['rss']:8.1f} {sample['traced']:8.2f} {sample['frames']:7d} "
+              f"{sample['acq_p50']:8.2f} {sample['acq_p99']:8.2f} {sample['disp_p99']:9.1f} {sample['dropped']:8d}")
+        if self.baseline_snapshot is None and elapsed >= self.args.warmup:
+            self.baseline_snapshot = tracemalloc.take_snapshot()
+            self.baseline_index = len(self.samples) - 1
+
+    def exercise(self):
+        # Drive the GUI paths that allocate: measurements and light spectra
+        p = self.plotter
+        if p.measurement_job is None:
+            p.instant_measurement()
+        if p.measurement3_job is None:
+            p.instant_measurement3()
+
+    def run(self):
+        args = self.args
+        p = self.plotter
+        p.connect_serial()
+        p.running = True
+        p.reading_started = True
+        p.single_check.setChecked(args.all_modes)
+        p.light_check.setChecked(args.all_modes)
+        data_thread = threading.Thread(target=p.read_loop)
+        data_thread.daemon = True
+        data_thread.start()
+
+        timers = []
+        for interval, slot in ((args.plot_interval, p.update_plot),
+                               (args.interval * 1000, self.sample),
+                               (args.exercise * 1000, self.exercise if args.exercise else None)):
+            if slot is None:
+                continue
+            timer = QtCore.QTimer()
+            timer.timeout.connect(slot)
+            timer.start(int(interval))
+            timers.append(timer)
+        QtCore.QTimer.singleShot(int(args.duration * 1000), p.app.quit)
+
+        print(f"{'t s':>8s} {'rss MB':>8s} {'heap MB':>8s} {'frames':>7s} "
+              f"{'acq p50':>8s} {'acq p99':>8s} {'disp p99':>9s} {'dropped':>8s}")
+        self.started = time.monotonic()
+        p.app.exec()
+        for timer in timers:
+            timer.stop()
+        p.running = False
+        data_thread.join()
+        self.sample()
+        self.report(tracemalloc.take_snapshot())
+        tracemalloc.stop()
+        return not self.failures
+
+    def check(self, ok, message):
+        if not ok:
+            self.failures.append(message)
+
+    @staticmethod
+    def drift(windows, key):
+        # Ratio of the late to the early median of a per-window statistic
+        quarter = max(len(windows) // 4, 1)
+        first = np.nanmedian([s[key] for s in windows[:quarter]])
+        final = np.nanmedian([s[key] for s in windows[-quarter:]])
+        return final / first if first else np.nan
+
+    def report(self, snapshot):
+        args = self.args
+        if self.baseline_snapshot is None:
+            print("Run shorter than warm-up, no drift gates applied")
+            return
+        base = self.samples[self.baseline_index]
+        windows = [s for s in self.samples[self.baseline_index + 1:] if s["frames"]]
+        last = self.samples[-1]
+
+        rss_growth = last["rss"] - base["rss"]
+        traced_growth = last["traced"] - base["traced"]
+        self.check(rss_growth <= args.max_rss_growth,
+                   f"RSS grew {rss_growth:.1f} MB (limit {args.max_rss_growth} MB)")
+        self.check(traced_growth <= args.max_heap_growth,
+                   f"Traced memory grew {traced_growth:.2f} MB (limit {args.max_heap_growth} MB)")
+
+        if len(windows) >= 2:
+            drift = self.drift(windows, "acq_p99")
+            self.check(not drift > args.max_latency_drift,
+                       f"Acquisition p99 latency drifted x{drift:.2f} (limit x{args.max_latency_drift})")
+            drift = self.drift(windows, "disp_p99")
+            self.check(not drift > args.max_display_drift,
+                       f"Display p99 latency drifted x{drift:.2f} (limit x{args.max_display_drift})")
+
+        sent = last["sent"] - base["sent"]
+        dropped = last["dropped"] - base["dropped"]
+        drop_fraction = dropped / sent if sent else 0.0
+        self.check(drop_fraction <= args.max_drop,
+                   f"Dropped {dropped} of {sent} frames ({drop_fraction:.2%}, limit {args.max_drop:.2%})")
+
+        print("\nTop allocation growth since warm-up:")
+        for stat in snapshot.compare_to(self.baseline_snapshot, "lineno")[:10]:
+            print(f"  {stat}")
+
+        print()
+        if self.failures:
+            for failure in self.failures:
+                print(f"FAIL: {failure}")
+        else:
+            print("PASS")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-run soak test against the simulated spectrometer")
+    parser.add_argument("--duration", type=float, default=3600, help="wall-clock run time in seconds")
+    parser.add_argument("--interval", type=float, default=30, help="seconds between samples")
+    parser.add_argument("--warmup", type=float, default=60, help="seconds before the baseline sample")
+    parser.add_argument("--frame-time", type=float, default=0.01, help="simulated integration time per frame")
+    parser.add_argument("--plot-interval", type=float, default=100, help="update_plot period in ms")
+    parser.add_argument("--exercise", type=float, default=20,
+                        help="seconds between Measurement / 3rd Spectra runs, 0 to disable")
+    parser.add_argument("--all-modes", action="store_true", help="also run the light and single VIS modes")
+    parser.add_argument("--trace-depth", type=int, default=1, help="tracemalloc frames per allocation")
+    parser.add_argument("--max-rss-growth", type=float, default=20, help="MB")
+    parser.add_argument("--max-heap-growth", type=float, default=5, help="MB of traced Python memory")
+    parser.add_argument("--max-latency-drift", type=float, default=1.5, help="ratio of late to early acquisition p99")
+    parser.add_argument("--max-display-drift", type=float, default=1.5, help="ratio of late to early display p99")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="fraction of frames")
+    args = parser.parse_args()
+
+    # Measurement files from --exercise go to a scratch directory
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        ok = SoakRun(args).run()
+    # Skip interpreter teardown: Qt objects outliving the app can crash it
+    # and turn a pass into a spurious failure
+    sys.stdout.flush()
+    os._exit(0 if ok else 1)
@@ -0,0 +1,100 @@
+import sys
+
+import numpy as np
+
+import recordings
+
+
+# Sensor wavelength axes as used by V7_0.py
+VIS_NM = np.linspace(340, 850, 296)
+IR_NM = np.linspace(640, 1050, 256)
+
+
+def _interp_weights(src, grid):
+    # Linear interpolation of src onto grid as (left index, right index,
+    # right weight); points outside src get weight 0 via the valid mask
+    right = np.clip(np.searchsorted(src, grid), 1, len(src) - 1)
+    left = right - 1
+    frac = (grid - src[left]) / (src[right] - src[left])
+    valid = (grid >= src[0]) & (grid <= src[-1])
+    return left, right, np.clip(frac, 0, 1), valid
+
+
+class Stitcher:
+    """Resamples VIS + IR spectra onto one uniform grid in a single product.
+
+    The interpolation and overlap blending are built once as a sparse matrix
+    in ELL form: every output pixel has at most 4 non-zero inputs (two
+    neighbouring VIS pixels, two IR pixels). In the overlap the VIS weight
+    falls linearly from 1 to 0 while the IR weight rises.
+
+    Single frames use the ELL form; batches use the equivalent dense
+    matrix (552 x 711, about 3 MB), whose matmul needs no per-frame gather.
+    """
+
+    def __init__(self, nm=VIS_NM, nmIR=IR_NM, step=1.0):
+        self.nm = np.asarray(nm, dtype=float)
+        self.nmIR = np.asarray(nmIR, dtype=float)
+        lo = self.nm[0]
+        hi = self.nmIR[-1]
+        self.grid = np.linspace(lo, hi, int(round((hi - lo) / step)) + 1)
+
+        vl, vr, vf, vvalid = _interp_weights(self.nm, self.grid)
+        il, ir, i_f, ivalid = _interp_weights(self.nmIR, self.grid)
+
+        overlap_lo, overlap_hi = self.nmIR[0], self.nm[-1]
+        blend = np.clip((self.grid - overlap_lo) / (overlap_hi - overlap_lo), 0, 1)
+        w_vis = np.where(vvalid, np.where(ivalid, 1 - blend, 1.0), 0.0)
+        w_ir = np.where(ivalid, np.where(vvalid, blend, 1.0), 0.0)
+
+        offset = len(self.nm)  # IR columns follow VIS in the input vector
+        self.columns = np.stack([vl, vr, il + offset, ir + offset], axis=1)
+        self.weights = np.stack([w_vis * (1 - vf), w_vis * vf, w_ir * (1 - i_f), w_ir * i_f], axis=1)
+        self.n_inputs = offset + len(self.nmIR)
+        self._dense_t = None
+
+    def dense(self):
+        # Equivalent dense matrix, for inspection
+        M = np.zeros((len(self.grid), self.n_inputs))
+        rows = np.repeat(np.arange(len(self.grid)), self.columns.shape[1])
+        np.add.at(M, (rows, self.columns.ravel()), self.weights.ravel())
+        return M
+
+    def stitch(self, spectra, spectraIR):
+        x = np.concatenate((spectra, spectraIR))
+        return np.einsum('ij,ij->i', x[self.columns], self.weights)
+
+    def stitch_batch(self, frames, framesIR, chunk_size=4096):
+        # frames: N x 296, framesIR: N x 256 -> N x len(grid)
+        frames = np.asarray(frames, dtype=float)
+        framesIR = np.asarray(framesIR, dtype=float)
+        if len(frames) != len(framesIR):
+            raise ValueError("VIS and IR recordings have different frame counts")
+        if self._dense_t is None:
+            self._dense_t = np.ascontiguousarray(self.dense().T)
+        vis_t = self._dense_t[:len(self.nm)]
+        ir_t = self._dense_t[len(self.nm):]
+        out = np.empty((len(frames), len(self.grid)))
+        # VIS and IR halves of the matrix separately, so no concatenated
+        # copy of the input; chunks bound the IR product temporary
+        for start in range(0, len(frames), chunk_size):
+            stop = start + chunk_size
+            np.matmul(frames[start:stop], vis_t, out=out[start:stop])
+            out[start:stop] += framesIR[start:stop] @ ir_t
+        return out
+
+
+def stitch_file(filename, stitcher=None):
+    # Spektri_*.txt -> <name>_stitched.txt with one combined section
+    stitcher = stitcher or Stitcher()
+    vis, ir = recordings.load_spektri(filename)
+    if vis is None or ir is None:
+        raise ValueError(f"{filename} needs both visible and infrared spectra")
+    out = filename[:-4] + "_stitched.txt" if filename.endswith(".txt") else filename + "_stitched"
+    recordings.write_sections(out, [(recordings.STITCHED_HEADER, stitcher.stitch_batch(vis, ir))])
+    return out
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:]:
+        print(stitch_file(name))
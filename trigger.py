@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import acquisition
+import recordings
+
+
+class BandSum:
+    """Integral of a wavelength band, as one dot product per frame."""
+
+    def __init__(self, nm, lo, hi, threshold, above=True):
+        self.weights = ((nm >= lo) & (nm <= hi)).astype(float)
+        self.threshold = threshold
+        self.above = above
+
+    def value(self, frame):
+        return self.weights @ frame
+
+    def __call__(self, frame):
+        value = self.value(frame)
+        return value >= self.threshold if self.above else value <= self.threshold
+
+
+class PeakHeight(BandSum):
+    """Highest pixel inside a wavelength band."""
+
+    def __init__(self, nm, lo, hi, threshold, above=True):
+        super().__init__(nm, lo, hi, threshold, above)
+        self.band = np.flatnonzero(self.weights)
+
+    def value(self, frame):
+        return frame[self.band].max()
+
+
+class BaselineChange(BandSum):
+    """Mean absolute change of a band against a slowly updated baseline.
+
+    The baseline is an exponential moving average of the spectrum with
+    factor alpha, updated in place after every evaluation.
+    """
+
+    def __init__(self, nm, lo, hi, threshold, alpha=0.02):
+        super().__init__(nm, lo, hi, threshold)
+        self.weights /= max(self.weights.sum(), 1.0)
+        self.alpha = alpha
+        self.baseline = None
+        self._diff = None
+
+    def value(self, frame):
+        if self.baseline is None:
+            self.baseline = np.array(frame, dtype=float)
+            self._diff = np.empty_like(self.baseline)
+            return 0.0
+        np.subtract(frame, self.baseline, out=self._diff)
+        self.baseline += self.alpha * self._diff
+        np.abs(self._diff, out=self._diff)
+        return self.weights @ self._diff
+
+
+class EventWriter:
+    """Writes captured events on a background thread.
+
+    Events are saved as .npz binary recordings (see recordings.save_binary),
+    which replay.py can play back directly.
+    """
+
+    def __init__(self, directory=".", on_saved=None):
+        self.directory = directory
+        self.on_saved = on_saved
+        self.queue = queue.Queue()
+        self.saved = 0
+        self.thread = threading.Thread(target=self._write_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, timestamps, frames, triggered_at):
+        self.queue.put((timestamps, frames, triggered_at))
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            timestamps, frames, triggered_at = item
+            self.saved += 1
+            filename = os.path.join(self.directory, time.strftime(
+                f"Event_%Y%m%d-%H%M%S_{self.saved}.npz", time.localtime(triggered_at)))
+            try:
+                recordings.save_binary(filename, timestamps, vis=frames[0], ir=frames[1] if len(frames) > 1 else None)
+                if self.on_saved is not None:
+                    self.on_saved(filename)
+            except OSError as e:
+                print(f"Error saving event: {e}")
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class TriggerEngine:
+    """Keeps pre-trigger history and captures frames around trigger events.
+
+    Conditions are evaluated on the first channel. A trigger fires on the
+    frame where any condition becomes true; the pre_frames before it and
+    post_frames after it (including the trigger frame) go to the writer.
+    The condition must clear before the engine can trigger again.
+    """
+
+    def __init__(self, conditions, widths, pre_frames, post_frames, writer):
+        self.conditions = list(conditions)
+        self.pre_frames = pre_frames
+        self.post_frames = max(post_frames, 1)
+        self.writer = writer
+        self.history = [acquisition.RingBuffer(max(pre_frames, 1), width) for width in widths]
+        self.post = None
+        self.post_count = 0
+        self.active = False
+        self.events = 0
+
+    def offer(self, t, *frame):
+        triggered = False
+        if self.post is not None:
+            self._collect(t, frame)
+        else:
+            condition = any(check(frame[0]) for check in self.conditions)
+            triggered = condition and not self.active
+            self.active = condition
+            if triggered:
+                self.events += 1
+                self._start_event(t, frame)
+        if self.pre_frames:
+            for buffer, data in zip(self.history, frame):
+                buffer.append(data, t)
+        return triggered
+
+    def _start_event(self, t, frame):
+        pre = [buffer.snapshot(self.pre_frames) if self.pre_frames else None for buffer in self.history]
+        count = len(pre[0][0]) if self.pre_frames else 0
+        total = count + self.post_frames
+        self.post_timestamps = np.empty(total)
+        self.post = [np.empty((total, buffer.width)) for buffer in self.history]
+        if count:
+            self.post_timestamps[:count] = pre[0][0]
+            for out, (_, frames) in zip(self.post, pre):
+                out[:count] = frames
+        self.post_count = count
+        self.triggered_at = time.time()
+        self._collect(t, frame)
+
+    def _collect(self, t, frame):
+        i = self.post_count
+        self.post_timestamps[i] = t
+        for out, data in zip(self.post, frame):
+            out[i] = data
+        self.post_count += 1
+        if self.post_count == len(self.post_timestamps):
+            self.writer.submit(self.post_timestamps, self.post, self.triggered_at)
+            self.post = None